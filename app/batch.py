@@ -0,0 +1,128 @@
+"""
+Azure OpenAI Batch API endpoints
+
+Bulk, non-interactive workloads run at half the real-time price against a
+separate rate-limit pool, with results available within 24 hours
+"""
+from fastapi import APIRouter, HTTPException, Depends, Path
+from typing import TYPE_CHECKING, Any, cast
+import logging
+import orjson
+
+from .config import get_settings
+from .dependencies import get_client, verify_token, reset_client_on_auth_error
+from .models import BatchChatRequest
+
+if TYPE_CHECKING:
+    from openai import AsyncAzureOpenAI
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix=f"{get_settings().API_V1_STR}/batch", tags=["batch"])
+
+# Azure expects the deployment-relative path here, not OpenAI's /v1 form
+_BATCH_ENDPOINT = cast(Any, "/chat/completions")
+# Batch ids as issued by Azure, e.g. "batch_6e9c7f0a-..."; anything else
+# (including a stray GET /batch/submit) is rejected before calling Azure
+_BATCH_ID_PATTERN = r"^batch_[A-Za-z0-9_-]+$"
+
+
+def _batch_input(request: BatchChatRequest) -> bytes:
+    """Serialize the items as Batch API JSONL, one request per line"""
+    model = get_settings().AZURE_FOUNDRY_MODEL
+    return b"\n".join(
+        orjson.dumps({
+            "custom_id": f"request-{index}",
+            "method": "POST",
+            "url": _BATCH_ENDPOINT,
+            "body": {
+                "model": model,
+                "messages": item.model_dump(include={"messages"})["messages"],
+                "max_tokens": item.max_tokens,
+                "temperature": item.temperature,
+            },
+        })
+        for index, item in enumerate(request.items)
+    )
+
+
+async def _output_lines(client: "AsyncAzureOpenAI", file_id: str) -> list:
+    """Download a Batch API output or error file as a list of parsed JSONL lines"""
+    output = await client.files.content(file_id)
+    return [orjson.loads(line) for line in output.content.splitlines() if line.strip()]
+
+
+def _http_error(exc: Exception) -> HTTPException:
+    """Map an Azure SDK error to the status the caller should see"""
+    # The SDK is already imported once a request has reached Azure
+    from openai import BadRequestError, NotFoundError
+
+    if isinstance(exc, NotFoundError):
+        return HTTPException(status_code=404, detail=f"Not found: {str(exc)}")
+    if isinstance(exc, BadRequestError):
+        return HTTPException(status_code=400, detail=f"Bad request: {str(exc)}")
+    return HTTPException(status_code=500, detail=f"Internal server error: {str(exc)}")
+
+
+@router.post("/submit")
+async def submit_batch(
+    request: BatchChatRequest,
+    token: str = Depends(verify_token),
+    client: "AsyncAzureOpenAI" = Depends(get_client)
+):
+    """
+    Upload the items as a batch job and return its id for polling
+    """
+    try:
+        input_file = await client.files.create(
+            file=("batch.jsonl", _batch_input(request)),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=_BATCH_ENDPOINT,
+            completion_window="24h"
+        )
+        return {"batch_id": batch.id, "status": batch.status}
+
+    except Exception as e:
+        logger.error(f"Error submitting Azure batch: {str(e)}")
+        # Rebuild the client only if its credentials were rejected
+        await reset_client_on_auth_error(e)
+        raise _http_error(e)
+
+
+@router.get("/{batch_id}")
+async def get_batch(
+    batch_id: str = Path(pattern=_BATCH_ID_PATTERN),
+    token: str = Depends(verify_token),
+    client: "AsyncAzureOpenAI" = Depends(get_client)
+):
+    """
+    Report a batch job's status, with its results once it has completed
+
+    Results are the Batch API output lines and errors the lines of items
+    that failed, both matched to the submitted items by custom_id
+    ("request-<index>"); when every item fails there is no output file and
+    results is null
+    """
+    try:
+        batch = await client.batches.retrieve(batch_id)
+        results = None
+        errors = None
+        if batch.status == "completed" and batch.output_file_id:
+            results = await _output_lines(client, batch.output_file_id)
+        if batch.error_file_id:
+            errors = await _output_lines(client, batch.error_file_id)
+        return {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "request_counts": batch.request_counts,
+            "results": results,
+            "errors": errors,
+        }
+
+    except Exception as e:
+        logger.error(f"Error retrieving Azure batch {batch_id}: {str(e)}")
+        # Rebuild the client only if its credentials were rejected
+        await reset_client_on_auth_error(e)
+        raise _http_error(e)
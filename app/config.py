@@ -2,95 +2,183 @@
 Configuration and Settings
 """
 import os
-from functools import lru_cache
-from typing import Optional
-from dotenv import load_dotenv
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ClassVar, FrozenSet, Optional, Tuple
 
+_ENV_FILE = Path(__file__).resolve().parent.parent / ".env"
+_LOADED = False
+# [export ]KEY=VALUE with surrounding whitespace; comments and blank lines do not match
+_ENV_LINE_RE = re.compile(r"^\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.*?)\s*$")
+# Inline comment after an unquoted value: whitespace, then '#' to end of line
+_ENV_COMMENT_RE = re.compile(r"\s+#.*$")
 
+
+@dataclass(frozen=True, slots=True)
 class Settings:
-    """Application settings"""
-    
-    def __init__(self):
-        # Load environment variables when creating settings instance
-        load_dotenv()
-        
-        # Azure Foundry Configuration
-        self.AZURE_FOUNDRY_ENDPOINT: str = os.getenv("AZURE_FOUNDRY_ENDPOINT", "")
-        self.AZURE_FOUNDRY_API_KEY: str = os.getenv("AZURE_FOUNDRY_API_KEY", "")
-        self.AZURE_FOUNDRY_DEPLOYMENT_NAME: str = os.getenv("AZURE_FOUNDRY_DEPLOYMENT_NAME", "gpt-4.1")
-        self.AZURE_FOUNDRY_MODEL: str = os.getenv("AZURE_FOUNDRY_MODEL", "gpt-4.1")  # Alias for deployment name
-        self.AZURE_FOUNDRY_API_VERSION: str = os.getenv("AZURE_FOUNDRY_API_VERSION", "2025-01-01-preview")
-        
-        # Application Configuration
-        self.APP_NAME: str = "Azure Foundry API"
-        self.APP_VERSION: str = "1.0.0"
-        self.API_V1_STR: str = "/api/v1"
-        self.PORT: int = int(os.getenv("PORT", "8000"))
-        self.HOST: str = os.getenv("HOST", "0.0.0.0")
-        
-        # Security
-        self.API_KEY_HEADER: str = os.getenv("API_KEY_HEADER", "X-API-Key")
-        self.JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "your-secret-key-here")
-        self.JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
-        self.JWT_EXPIRATION_HOURS: int = int(os.getenv("JWT_EXPIRATION_HOURS", "24"))
-        
-        # CORS
-        self.ALLOWED_ORIGINS: list = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,https://yourdomain.com").split(",")
-        self.ALLOWED_METHODS: list = os.getenv("ALLOWED_METHODS", "GET,POST,PUT,DELETE").split(",")
-        self.ALLOWED_HEADERS: list = os.getenv("ALLOWED_HEADERS", "*").split(",")
-        
-        # Rate Limiting
-        self.RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
-        self.RATE_LIMIT_WINDOW: int = int(os.getenv("RATE_LIMIT_WINDOW", "3600"))  # 1 hour
-        
-        # Logging
-        self.LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-        
-        # Environment
-        self.ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
-        self.DEBUG: bool = self.ENVIRONMENT.lower() == "development"
-        
-        # Azure Application Insights
-        self.APPLICATIONINSIGHTS_CONNECTION_STRING: Optional[str] = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
-        
-        # Health Check
-        self.HEALTH_CHECK_INTERVAL: int = int(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
-        
-        # Request Timeout
-        self.REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "30"))
-        
-        # Default Model Parameters
-        self.DEFAULT_MAX_TOKENS: int = int(os.getenv("DEFAULT_MAX_TOKENS", "1000"))
-        self.DEFAULT_TEMPERATURE: float = float(os.getenv("DEFAULT_TEMPERATURE", "0.7"))
-        self.DEFAULT_TOP_P: float = float(os.getenv("DEFAULT_TOP_P", "1.0"))
-    
+    """Application settings, populated once from the environment at import"""
+
+    # Azure Foundry Configuration
+    AZURE_FOUNDRY_ENDPOINT: str
+    AZURE_FOUNDRY_API_KEY: str
+    AZURE_FOUNDRY_DEPLOYMENT_NAME: str
+    AZURE_FOUNDRY_MODEL: str  # Alias for deployment name
+    AZURE_FOUNDRY_API_VERSION: str
+
+    # Application Configuration
+    APP_NAME: ClassVar[str] = "Azure Foundry API"
+    APP_VERSION: ClassVar[str] = "1.0.0"
+    API_V1_STR: ClassVar[str] = "/api/v1"
+    PORT: int
+    HOST: str
+    # uvicorn worker processes when not reloading; None leaves the default to
+    # the entry point (4 for main.py, 2 x CPU cores + 1 for run_dev.py)
+    WEB_CONCURRENCY: Optional[int]
+
+    # Security
+    API_KEY_HEADER: str
+    API_KEYS: FrozenSet[str]  # empty accepts any bearer token (development)
+    JWT_SECRET_KEY: str
+    JWT_ALGORITHM: str
+    JWT_EXPIRATION_HOURS: int
+
+    # CORS
+    ALLOWED_ORIGINS: Tuple[str, ...]
+    ALLOWED_METHODS: Tuple[str, ...]
+    ALLOWED_HEADERS: Tuple[str, ...]
+
+    # Rate Limiting
+    RATE_LIMIT_REQUESTS: int
+    RATE_LIMIT_WINDOW: int  # seconds
+
+    # Logging
+    LOG_LEVEL: str
+
+    # Environment
+    ENVIRONMENT: str
+
+    # Azure Application Insights
+    APPLICATIONINSIGHTS_CONNECTION_STRING: Optional[str]
+
+    # Health Check
+    HEALTH_CHECK_INTERVAL: int
+
+    # Request Timeout
+    REQUEST_TIMEOUT: int
+    # Seconds to wait for Azure to produce the response (or the next streamed
+    # chunk); completions routinely take longer than REQUEST_TIMEOUT
+    AZURE_READ_TIMEOUT: int
+
+    # Retries for transient Azure errors (429, 5xx, timeouts), with backoff.
+    # A call that keeps timing out is attempted 1 + AZURE_MAX_RETRIES times,
+    # so it can take up to (1 + AZURE_MAX_RETRIES) * AZURE_READ_TIMEOUT
+    # seconds plus backoff before failing
+    AZURE_MAX_RETRIES: int
+
+    # Outbound HTTP connection pool (Azure Foundry)
+    HTTP_MAX_CONNECTIONS: int
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int
+
+    # Response cache for repeated low-temperature completions
+    RESPONSE_CACHE_SIZE: int  # 0 disables the cache
+    RESPONSE_CACHE_TTL: int  # seconds
+
+    # Default Model Parameters
+    DEFAULT_MAX_TOKENS: int
+    DEFAULT_TEMPERATURE: float
+    DEFAULT_TOP_P: float
+
+    @property
+    def DEBUG(self) -> bool:
+        return self.ENVIRONMENT.lower() == "development"
+
     def validate_required_settings(self) -> list:
         """Validate that required settings are present"""
         errors = []
-        
+
         if not self.AZURE_FOUNDRY_ENDPOINT:
             errors.append("AZURE_FOUNDRY_ENDPOINT is required")
-        
+
         if not self.AZURE_FOUNDRY_API_KEY:
             errors.append("AZURE_FOUNDRY_API_KEY is required")
-        
+
         if not self.AZURE_FOUNDRY_DEPLOYMENT_NAME:
             errors.append("AZURE_FOUNDRY_DEPLOYMENT_NAME is required")
-        
+
         return errors
 
 
-@lru_cache()
+def _env_value(raw: str) -> str:
+    """Unquote a raw .env value the way python-dotenv does"""
+    # A value wrapped in matching quotes is taken literally, '#' included,
+    # and may be followed by a comment
+    if raw[:1] in ("'", '"'):
+        end = raw.find(raw[0], 1)
+        rest = raw[end + 1:].strip() if end > 0 else ""
+        if end > 0 and (not rest or rest.startswith("#")):
+            return raw[1:end]
+    # Otherwise " # ..." starts an inline comment
+    return _ENV_COMMENT_RE.sub("", raw)
+
+
+def _load_env_once() -> None:
+    """Copy KEY=VALUE lines from the project .env file into os.environ, once"""
+    global _LOADED
+    if _LOADED:
+        return
+    _LOADED = True
+
+    if not _ENV_FILE.is_file():
+        return
+
+    # utf-8-sig also accepts files written by PowerShell's Out-File -Encoding utf8
+    for line in _ENV_FILE.read_text(encoding="utf-8-sig").splitlines():
+        match = _ENV_LINE_RE.match(line)
+        if match:
+            # Variables already set in the process environment take precedence
+            os.environ.setdefault(match.group(1), _env_value(match.group(2)))
+
+
+# Load the project .env file and read the environment exactly once
+_load_env_once()
+
+_SETTINGS = Settings(
+    AZURE_FOUNDRY_ENDPOINT=os.getenv("AZURE_FOUNDRY_ENDPOINT", ""),
+    AZURE_FOUNDRY_API_KEY=os.getenv("AZURE_FOUNDRY_API_KEY", ""),
+    AZURE_FOUNDRY_DEPLOYMENT_NAME=os.getenv("AZURE_FOUNDRY_DEPLOYMENT_NAME", "gpt-4.1"),
+    AZURE_FOUNDRY_MODEL=os.getenv("AZURE_FOUNDRY_MODEL", "gpt-4.1"),
+    AZURE_FOUNDRY_API_VERSION=os.getenv("AZURE_FOUNDRY_API_VERSION", "2025-01-01-preview"),
+    PORT=int(os.getenv("PORT", "8000")),
+    HOST=os.getenv("HOST", "0.0.0.0"),
+    WEB_CONCURRENCY=int(os.getenv("WEB_CONCURRENCY") or os.getenv("UVICORN_WORKERS") or 0) or None,
+    API_KEY_HEADER=os.getenv("API_KEY_HEADER", "X-API-Key"),
+    API_KEYS=frozenset(key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip()),
+    JWT_SECRET_KEY=os.getenv("JWT_SECRET_KEY", "your-secret-key-here"),
+    JWT_ALGORITHM=os.getenv("JWT_ALGORITHM", "HS256"),
+    JWT_EXPIRATION_HOURS=int(os.getenv("JWT_EXPIRATION_HOURS", "24")),
+    ALLOWED_ORIGINS=tuple(os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,https://yourdomain.com").split(",")),
+    ALLOWED_METHODS=tuple(os.getenv("ALLOWED_METHODS", "GET,POST,PUT,DELETE").split(",")),
+    ALLOWED_HEADERS=tuple(os.getenv("ALLOWED_HEADERS", "*").split(",")),
+    RATE_LIMIT_REQUESTS=int(os.getenv("RATE_LIMIT_REQUESTS", "100")),
+    RATE_LIMIT_WINDOW=int(os.getenv("RATE_LIMIT_WINDOW", "3600")),  # 1 hour
+    LOG_LEVEL=os.getenv("LOG_LEVEL", "INFO"),
+    ENVIRONMENT=os.getenv("ENVIRONMENT", "development"),
+    APPLICATIONINSIGHTS_CONNECTION_STRING=os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING"),
+    HEALTH_CHECK_INTERVAL=int(os.getenv("HEALTH_CHECK_INTERVAL", "30")),
+    REQUEST_TIMEOUT=int(os.getenv("REQUEST_TIMEOUT", "30")),
+    AZURE_READ_TIMEOUT=int(os.getenv("AZURE_READ_TIMEOUT", "120")),
+    AZURE_MAX_RETRIES=int(os.getenv("AZURE_MAX_RETRIES", "3")),
+    HTTP_MAX_CONNECTIONS=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    HTTP_MAX_KEEPALIVE_CONNECTIONS=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    RESPONSE_CACHE_SIZE=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+    RESPONSE_CACHE_TTL=int(os.getenv("RESPONSE_CACHE_TTL", "300")),
+    DEFAULT_MAX_TOKENS=int(os.getenv("DEFAULT_MAX_TOKENS", "1000")),
+    DEFAULT_TEMPERATURE=float(os.getenv("DEFAULT_TEMPERATURE", "0.7")),
+    DEFAULT_TOP_P=float(os.getenv("DEFAULT_TOP_P", "1.0")),
+)
+
+
 def get_settings() -> Settings:
-    """Get cached settings instance"""
-    return Settings()
-
-
-# Simple config for backward compatibility
-class Config:
-    def __init__(self):
-        settings = get_settings()
-        self.AZURE_FOUNDRY_ENDPOINT = settings.AZURE_FOUNDRY_ENDPOINT
-        self.AZURE_FOUNDRY_API_KEY = settings.AZURE_FOUNDRY_API_KEY
-        self.AZURE_FOUNDRY_DEPLOYMENT_NAME = settings.AZURE_FOUNDRY_DEPLOYMENT_NAME
-        self.API_VERSION = settings.AZURE_FOUNDRY_API_VERSION
+    """Get the settings instance built at import"""
+    return _SETTINGS
@@ -1,26 +1,36 @@
 """
 FastAPI Dependencies
 """
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from functools import lru_cache
+from typing import TYPE_CHECKING
 import logging
-from openai import AzureOpenAI
+import httpx
 from .config import get_settings
 
+if TYPE_CHECKING:
+    from openai import AsyncAzureOpenAI
+
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
 
-@lru_cache()
-def get_azure_openai_client() -> AzureOpenAI:
+@lru_cache(maxsize=1)
+def get_azure_openai_client() -> "AsyncAzureOpenAI":
     """
-    Get Azure OpenAI client with LRU caching
+    Get async Azure OpenAI client with LRU caching
     This approach:
     - Caches the client but allows for invalidation
     - Recreates client if configuration changes
     - Better error handling and recovery
+    - Reuses pooled keep-alive connections to the Azure endpoint
+    - Multiplexes concurrent requests over HTTP/2
+    - Awaits Azure calls instead of blocking the event loop
     """
+    # Imported here so processes only pay for the openai SDK import on first use
+    from openai import AsyncAzureOpenAI
+    
     settings = get_settings()
     
     if not settings.AZURE_FOUNDRY_ENDPOINT or not settings.AZURE_FOUNDRY_API_KEY:
@@ -30,10 +40,25 @@ def get_azure_openai_client() -> AzureOpenAI:
         )
     
     try:
-        return AzureOpenAI(
+        http_client = httpx.AsyncClient(
+            http2=True,
+            # Connecting and sending stay short; waiting for a completion
+            # gets its own, longer budget so slow replies aren't cut off
+            # (and retried) at REQUEST_TIMEOUT
+            timeout=httpx.Timeout(settings.REQUEST_TIMEOUT, read=settings.AZURE_READ_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        return AsyncAzureOpenAI(
             azure_endpoint=settings.AZURE_FOUNDRY_ENDPOINT,
             api_key=settings.AZURE_FOUNDRY_API_KEY,
             api_version=settings.AZURE_FOUNDRY_API_VERSION,
+            http_client=http_client,
+            # The SDK retries 429/5xx/connection errors with jittered
+            # exponential backoff and honours Retry-After
+            max_retries=settings.AZURE_MAX_RETRIES,
         )
     except Exception as e:
         logger.error(f"Failed to create Azure OpenAI client: {str(e)}")
@@ -43,15 +68,50 @@ def get_azure_openai_client() -> AzureOpenAI:
         )
 
 
-def clear_azure_client_cache():
-    """Clear the cached Azure OpenAI client"""
+async def get_client(request: Request) -> "AsyncAzureOpenAI":
+    """
+    FastAPI dependency for the shared Azure OpenAI client
+    Declared async so FastAPI resolves it on the event loop instead of
+    dispatching a sync dependency to the threadpool on every request.
+    Returns the client built at startup from app.state, rebuilding it only
+    when startup could not create it or it was closed by
+    clear_azure_client_cache
+    """
+    client = getattr(request.app.state, "azure_client", None)
+    if client is None or client.is_closed():
+        client = request.app.state.azure_client = get_azure_openai_client()
+    return client
+
+
+async def clear_azure_client_cache():
+    """Clear the cached Azure OpenAI client and close its connection pool"""
+    if get_azure_openai_client.cache_info().currsize:
+        await get_azure_openai_client().close()
     get_azure_openai_client.cache_clear()
 
 
+async def reset_client_on_auth_error(exc: Exception):
+    """
+    Drop the cached client when Azure rejected its credentials
+    Other errors leave it alone, since closing it would also drop the
+    pooled connections of every other in-flight request
+    """
+    # The SDK is already imported once a request has reached Azure
+    from openai import AuthenticationError
+
+    if isinstance(exc, AuthenticationError):
+        await clear_azure_client_cache()
+
+
+# Accepted bearer tokens, read once at import
+_API_KEYS = get_settings().API_KEYS
+
+
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verify API token - implement your auth logic here"""
-    # For now, we'll do basic validation
-    # In production, implement proper JWT or API key validation
-    if not credentials.credentials:
+    """Verify API token"""
+    token = credentials.credentials
+    # With no API_KEYS configured any non-empty token is accepted (development)
+    # In production, set API_KEYS or implement proper JWT validation
+    if not token or (_API_KEYS and token not in _API_KEYS):
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    return credentials.credentials
+    return token
@@ -1,19 +1,23 @@
 """
 Pydantic models for the Azure Foundry API
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
 from datetime import datetime
 
 
 class ChatMessage(BaseModel):
     """A single chat message"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     role: str
     content: str
 
 
 class ChatRequest(BaseModel):
     """Request model for chat completion"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     messages: List[ChatMessage]
     model: Optional[str] = None
     max_tokens: Optional[int] = 1000
@@ -23,6 +27,8 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     """Response model for chat completion"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     id: str
     object: str
     created: int
@@ -31,8 +37,25 @@ class ChatResponse(BaseModel):
     usage: dict
 
 
+class BatchChatRequest(BaseModel):
+    """Request model for a batch of independent chat completions"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    items: List[ChatRequest]
+
+
+class BatchItemError(BaseModel):
+    """A batch item whose completion failed, at its position in the batch"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    index: int
+    error: str
+
+
 class GenerateRequest(BaseModel):
     """Request model for text generation"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     prompt: str
     model: Optional[str] = None
     max_tokens: Optional[int] = 1000
@@ -41,6 +64,8 @@ class GenerateRequest(BaseModel):
 
 class HealthResponse(BaseModel):
     """Response model for health check"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     status: str
     message: str
     azure_endpoint: Optional[str] = None
@@ -48,6 +73,8 @@ class HealthResponse(BaseModel):
 
 class ModelInfo(BaseModel):
     """Model information"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     id: str
     object: str
     owned_by: str
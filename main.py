@@ -3,51 +3,114 @@ FastAPI Backend for Azure Foundry Model Integration
 """
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List, cast, Any
-from datetime import datetime
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from typing import TYPE_CHECKING, Optional, List, Union, AsyncIterator, cast, Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+import asyncio
 import logging
-import os
-from openai import AzureOpenAI
+import time
+import anyio
+import orjson
 
 from app.models import (
     ChatRequest, ChatResponse, GenerateRequest, 
-    HealthResponse, ModelInfo, ChatMessage
+    HealthResponse, ModelInfo, ChatMessage, BatchChatRequest, BatchItemError
 )
 from app.config import get_settings
-from app.dependencies import get_azure_openai_client, verify_token, clear_azure_client_cache
+from app import batch
+from app.dependencies import (
+    get_azure_openai_client, get_client, verify_token,
+    clear_azure_client_cache, reset_client_on_auth_error
+)
+
+if TYPE_CHECKING:
+    # The openai SDK is imported lazily by app.dependencies.get_azure_openai_client
+    from openai import AsyncAzureOpenAI
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fixed sampling parameters shared by every completion call
+_COMPLETION_DEFAULTS = {
+    "top_p": 0.95,
+    "frequency_penalty": 0,
+    "presence_penalty": 0,
+    "stop": None,
+}
+
+# System prompt for /api/v1/generate; shared across requests, never mutated
+_GENERATE_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a helpful AI assistant focused on generating high-quality text content."
+}
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+# Second-resolution timestamp for responses, refreshed by _tick_now_iso
+_NOW_ISO = _utc_now_iso()
+
+async def _tick_now_iso():
+    """Refresh _NOW_ISO once a second so handlers never format a datetime"""
+    global _NOW_ISO
+    while True:
+        await asyncio.sleep(1)
+        _NOW_ISO = _utc_now_iso()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    ticker = asyncio.create_task(_tick_now_iso())
+    # Build the pooled Azure client before the first request arrives;
+    # missing configuration is still reported per request
+    try:
+        app.state.azure_client = get_azure_openai_client()
+    except HTTPException as e:
+        logger.warning(f"Azure OpenAI client not initialized at startup: {e.detail}")
+    yield
+    ticker.cancel()
+    # Close the pooled Azure connections
+    await clear_azure_client_cache()
+
 # FastAPI app instance
 app = FastAPI(
     title="Azure Foundry API",
     description="Backend API for Azure Foundry Model Integration",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure this properly for production
+    allow_origins=get_settings().ALLOWED_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=get_settings().ALLOWED_METHODS,
+    allow_headers=get_settings().ALLOWED_HEADERS,
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
+# Azure Batch API endpoints (/api/v1/batch/...)
+app.include_router(batch.router)
+
+# The health payload only depends on settings, so it is serialized once
+_HEALTH_JSON = orjson.dumps(HealthResponse(
+    status="healthy",
+    message="Azure Foundry API is running",
+    azure_endpoint=get_settings().AZURE_FOUNDRY_ENDPOINT
+).model_dump())
+
 # Health check endpoint
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
-    settings = get_settings()
-    return HealthResponse(
-        status="healthy",
-        message="Azure Foundry API is running",
-        azure_endpoint=settings.AZURE_FOUNDRY_ENDPOINT
-    )
+    return Response(content=_HEALTH_JSON, media_type="application/json")
 
 # Root endpoint
 @app.get("/")
@@ -55,75 +118,255 @@ async def root():
     """Root endpoint"""
     return {"message": "Azure Foundry API is running", "docs": "/docs"}
 
+# Seconds of upstream silence before a keep-alive comment is sent to the client
+_SSE_HEARTBEAT_INTERVAL = 15
+
+async def _sse_events(stream) -> AsyncIterator[str]:
+    """Forward Azure completion chunks to the caller as server-sent events"""
+    chunks = stream.__aiter__()
+    # The pending read is waited on rather than cancelled on timeout, so a
+    # heartbeat never drops a chunk that is still in flight
+    pending = asyncio.ensure_future(chunks.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=_SSE_HEARTBEAT_INTERVAL)
+            if not done:
+                # SSE comment line; keeps idle proxies from closing the connection
+                yield ": ping\n\n"
+                continue
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                break
+            yield f"data: {chunk.model_dump_json()}\n\n"
+            pending = asyncio.ensure_future(chunks.__anext__())
+        # Only a stream that ran to its end is terminated for the client
+        yield "data: [DONE]\n\n"
+    except Exception as e:
+        logger.error(f"Error streaming from Azure Foundry: {str(e)}")
+        yield f"data: {orjson.dumps({'error': str(e)}).decode()}\n\n"
+    finally:
+        pending.cancel()
+        # Release the pooled HTTP/2 stream and stop Azure generating tokens, on
+        # normal end, upstream error or client disconnect alike; on disconnect
+        # Starlette cancels this task, so the close is shielded to finish
+        with anyio.CancelScope(shield=True):
+            await stream.close()
+
+def _chat_messages(request: ChatRequest) -> Any:
+    """Convert our ChatMessage objects to the format expected by Azure OpenAI"""
+    # ChatMessage has exactly the role/content fields Azure expects, so one
+    # pydantic-core dump replaces a per-message Python loop
+    return cast(Any, request.model_dump(include={"messages"})["messages"])
+
+async def _stream_chat_completion(request: ChatRequest, client: "AsyncAzureOpenAI") -> StreamingResponse:
+    """Start a streamed Azure completion and forward tokens as they arrive"""
+    stream = await client.chat.completions.create(
+        model=get_settings().AZURE_FOUNDRY_MODEL,
+        messages=_chat_messages(request),
+        max_tokens=request.max_tokens,
+        temperature=request.temperature,
+        **_COMPLETION_DEFAULTS,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    return StreamingResponse(_sse_events(stream), media_type="text/event-stream")
+
+# Completions for identical low-temperature requests, keyed by the serialized
+# request and holding (expires_at, completion) in least-recently-used order
+_RESPONSE_CACHE: "OrderedDict[bytes, tuple[float, Any]]" = OrderedDict()
+# Above this temperature answers vary enough that replaying one would be stale
+_CACHEABLE_MAX_TEMPERATURE = 0.3
+
+# Azure calls currently running, keyed like _RESPONSE_CACHE; concurrent
+# identical requests await the same task instead of calling Azure again
+_INFLIGHT: "dict[bytes, asyncio.Task]" = {}
+
+async def _do_chat(
+    client: "AsyncAzureOpenAI",
+    messages: Any,
+    max_tokens: Optional[int],
+    temperature: Optional[float]
+):
+    """Run one non-streaming completion; callers shape their own response"""
+    settings = get_settings()
+    key = orjson.dumps([messages, max_tokens, temperature])
+    cacheable = (
+        settings.RESPONSE_CACHE_SIZE > 0
+        and temperature is not None
+        and temperature <= _CACHEABLE_MAX_TEMPERATURE
+    )
+    if cacheable:
+        cached = _RESPONSE_CACHE.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            _RESPONSE_CACHE.move_to_end(key)
+            return cached[1]
+
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(client.chat.completions.create(
+            model=settings.AZURE_FOUNDRY_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **_COMPLETION_DEFAULTS,
+            stream=False
+        ))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    # Shielded so one caller disconnecting doesn't cancel the call for the rest
+    completion = await asyncio.shield(task)
+
+    if cacheable:
+        _RESPONSE_CACHE[key] = (time.monotonic() + settings.RESPONSE_CACHE_TTL, completion)
+        _RESPONSE_CACHE.move_to_end(key)
+        if len(_RESPONSE_CACHE) > settings.RESPONSE_CACHE_SIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+    return completion
+
+def _chat_response(completion) -> ChatResponse:
+    """Convert an Azure OpenAI completion to our ChatResponse"""
+    # Convert Azure OpenAI response to our format
+    choices = []
+    for choice in completion.choices:
+        choices.append({
+            "index": choice.index,
+            "message": {
+                "role": choice.message.role,
+                "content": choice.message.content
+            },
+            "finish_reason": choice.finish_reason
+        })
+
+    # The completion comes straight from Azure and is already well-typed,
+    # so skip re-validating it on the way out
+    return ChatResponse.model_construct(
+        id=completion.id,
+        object=completion.object,
+        created=completion.created,
+        model=completion.model,
+        choices=choices,
+        usage={
+            "prompt_tokens": completion.usage.prompt_tokens if completion.usage else 0,
+            "completion_tokens": completion.usage.completion_tokens if completion.usage else 0,
+            "total_tokens": completion.usage.total_tokens if completion.usage else 0
+        }
+    )
+
 # Chat completion endpoint
 @app.post("/api/v1/chat/completions", response_model=ChatResponse)
 async def chat_completion(
     request: ChatRequest,
+    stream: bool = False,
     token: str = Depends(verify_token),
-    client: AzureOpenAI = Depends(get_azure_openai_client)
+    client: "AsyncAzureOpenAI" = Depends(get_client)
 ):
     """
     Chat completion using Azure Foundry model
+    
+    Set "stream": true in the body or ?stream=true to receive the completion
+    as server-sent events
     """
     try:
-        settings = get_settings()
+        if stream or request.stream:
+            return await _stream_chat_completion(request, client)
         
-        # Convert our ChatMessage objects to the format expected by Azure OpenAI
-        messages = cast(Any, [
-            {"role": message.role, "content": message.content}
-            for message in request.messages
-        ])
-        
-        # Generate the completion
-        completion = client.chat.completions.create(
-            model=settings.AZURE_FOUNDRY_MODEL,
-            messages=messages,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature,
-            top_p=0.95,
-            frequency_penalty=0,
-            presence_penalty=0,
-            stop=None,
-            stream=False  # Force non-streaming for now
-        )
-        
-        # Convert Azure OpenAI response to our format
-        choices = []
-        for choice in completion.choices:
-            choices.append({
-                "index": choice.index,
-                "message": {
-                    "role": choice.message.role,
-                    "content": choice.message.content
-                },
-                "finish_reason": choice.finish_reason
-            })
-        
-        return ChatResponse(
-            id=completion.id,
-            object=completion.object,
-            created=completion.created,
-            model=completion.model,
-            choices=choices,
-            usage={
-                "prompt_tokens": completion.usage.prompt_tokens if completion.usage else 0,
-                "completion_tokens": completion.usage.completion_tokens if completion.usage else 0,
-                "total_tokens": completion.usage.total_tokens if completion.usage else 0
-            }
+        completion = await _do_chat(
+            client, _chat_messages(request), request.max_tokens, request.temperature
         )
+        return _chat_response(completion)
         
     except Exception as e:
         logger.error(f"Error calling Azure Foundry: {str(e)}")
-        # Clear cache in case of client issues
-        clear_azure_client_cache()
+        # Rebuild the client only if its credentials were rejected
+        await reset_client_on_auth_error(e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+# Streaming chat completion endpoint
+@app.post("/api/v1/chat/completions/stream", response_class=StreamingResponse)
+async def chat_completion_stream(
+    request: ChatRequest,
+    token: str = Depends(verify_token),
+    client: "AsyncAzureOpenAI" = Depends(get_client)
+):
+    """
+    Chat completion streamed as server-sent events, regardless of the "stream" field
+    """
+    try:
+        return await _stream_chat_completion(request, client)
+    except Exception as e:
+        logger.error(f"Error calling Azure Foundry: {str(e)}")
+        # Rebuild the client only if its credentials were rejected
+        await reset_client_on_auth_error(e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _auth_error(exc: BaseException) -> Optional[Exception]:
+    """Return exc if Azure rejected the client's credentials, else None"""
+    # The SDK is already imported once a request has reached Azure
+    from openai import AuthenticationError
+
+    return exc if isinstance(exc, AuthenticationError) else None
+
+# Upper bound on Azure calls one batch request keeps in flight
+_BATCH_CONCURRENCY = 10
+
+# Batch chat completion endpoint
+@app.post("/api/v1/chat/completions:batch", response_model=List[Union[ChatResponse, BatchItemError]])
+async def chat_completion_batch(
+    request: BatchChatRequest,
+    token: str = Depends(verify_token),
+    client: "AsyncAzureOpenAI" = Depends(get_client)
+):
+    """
+    Run several independent chat completions concurrently
+    
+    Results keep the order of the submitted items; an item that fails is
+    returned as {"index": ..., "error": ...} without failing the others.
+    Items are never streamed.
+    """
+    semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+    async def one(item: ChatRequest):
+        async with semaphore:
+            return await _do_chat(
+                client, _chat_messages(item), item.max_tokens, item.temperature
+            )
+
+    # Dispatch longest prompts first: the semaphore admits items in this order,
+    # so similar lengths run together and the slowest items don't start last
+    order = sorted(
+        range(len(request.items)),
+        key=lambda i: sum(len(m.content) for m in request.items[i].messages),
+        reverse=True
+    )
+    dispatched = await asyncio.gather(
+        *(one(request.items[i]) for i in order), return_exceptions=True
+    )
+    # Reassemble in the submitted order
+    results: List[Any] = [None] * len(order)
+    for i, result in zip(order, dispatched):
+        results[i] = result
+
+    responses: List[Union[ChatResponse, BatchItemError]] = []
+    auth_error = None
+    for index, result in enumerate(results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error calling Azure Foundry for batch item {index}: {str(result)}")
+            responses.append(BatchItemError(index=index, error=str(result)))
+            auth_error = auth_error or _auth_error(result)
+        else:
+            responses.append(_chat_response(result))
+    # Every item shares the client, so one rejected credential rebuilds it once
+    if auth_error is not None:
+        await reset_client_on_auth_error(auth_error)
+    return responses
+
 # Generate text endpoint
 @app.post("/api/v1/generate")
 async def generate_text(
     request: GenerateRequest,
     token: str = Depends(verify_token),
-    client: AzureOpenAI = Depends(get_azure_openai_client)
+    client: "AsyncAzureOpenAI" = Depends(get_client)
 ):
     """
     Text generation endpoint - optimized for single-turn text generation tasks
@@ -133,28 +376,14 @@ async def generate_text(
         
         # Prepare messages for text generation
         messages = cast(Any, [
-            {
-                "role": "system",
-                "content": "You are a helpful AI assistant focused on generating high-quality text content."
-            },
+            _GENERATE_SYSTEM_MESSAGE,
             {
                 "role": "user", 
                 "content": request.prompt
             }
         ])
         
-        # Generate the completion
-        completion = client.chat.completions.create(
-            model=settings.AZURE_FOUNDRY_MODEL,
-            messages=messages,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature,
-            top_p=0.95,
-            frequency_penalty=0,
-            presence_penalty=0,
-            stop=None,
-            stream=False
-        )
+        completion = await _do_chat(client, messages, request.max_tokens, request.temperature)
         
         # Extract response
         generated_text = completion.choices[0].message.content
@@ -164,51 +393,65 @@ async def generate_text(
         return {
             "generated_text": generated_text,
             "model": request.model or settings.AZURE_FOUNDRY_MODEL,
-            "timestamp": datetime.now(),
+            "timestamp": _NOW_ISO,
             "tokens_used": tokens_used,
             "generation_type": "text_completion"
         }
         
     except Exception as e:
         logger.error(f"Error in text generation: {str(e)}")
-        # Clear cache in case of client issues
-        clear_azure_client_cache()
+        # Rebuild the client only if its credentials were rejected
+        await reset_client_on_auth_error(e)
         raise HTTPException(status_code=500, detail=f"Text generation error: {str(e)}")
 
+# For now, the model list is static
+# In production, you might query Azure Foundry for available models
+_MODELS = [
+    ModelInfo(
+        id="gpt-4o",
+        object="model",
+        owned_by="azure-foundry"
+    ),
+    ModelInfo(
+        id="gpt-35-turbo",
+        object="model",
+        owned_by="azure-foundry"
+    )
+]
+# Serialized once at import; response_model is kept for the OpenAPI schema
+_MODELS_JSON = orjson.dumps([model.model_dump() for model in _MODELS])
+
 # List available models
 @app.get("/api/v1/models", response_model=List[ModelInfo])
 async def list_models():
     """
     List available models
     """
-    settings = get_settings()
-    
-    # For now, return a static list
-    # In production, you might query Azure Foundry for available models
-    models = [
-        ModelInfo(
-            id="gpt-4o",
-            object="model",
-            owned_by="azure-foundry"
-        ),
-        ModelInfo(
-            id="gpt-35-turbo",
-            object="model",
-            owned_by="azure-foundry"
-        )
-    ]
-    return models
+    return Response(content=_MODELS_JSON, media_type="application/json")
 
 # Error handlers
+# The bodies never change, so every error reuses one pre-serialized response
+_NOT_FOUND = ORJSONResponse({"error": "Endpoint not found", "status_code": 404}, status_code=404)
+_INTERNAL_ERROR = ORJSONResponse({"error": "Internal server error", "status_code": 500}, status_code=500)
+
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
-    return {"error": "Endpoint not found", "status_code": 404}
+    return _NOT_FOUND
 
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
-    return {"error": "Internal server error", "status_code": 500}
+    return _INTERNAL_ERROR
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    settings = get_settings()
+    # Multiple workers need the app as an import string; uvloop has no Windows build
+    uvicorn.run(
+        "main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=settings.WEB_CONCURRENCY or 4,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    )
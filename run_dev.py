@@ -2,16 +2,14 @@
 """
 Development server script
 """
-import uvicorn
 import os
-from dotenv import load_dotenv
+import sys
+import uvicorn
 from app.config import get_settings
 
 def main():
     """Run the development server"""
-    # Load environment variables from .env file
-    load_dotenv()
-    
+    # Settings reads the .env file itself, once per process
     settings = get_settings()
     
     # Validate required settings
@@ -29,11 +27,19 @@ def main():
     print(f"Azure Foundry Endpoint: {settings.AZURE_FOUNDRY_ENDPOINT}")
     print(f"Azure Foundry Deployment: {settings.AZURE_FOUNDRY_DEPLOYMENT_NAME}")
     
+    # reload watches files from a single process, so workers only apply without it
+    workers = 1 if settings.DEBUG else settings.WEB_CONCURRENCY or 2 * (os.cpu_count() or 1) + 1
+    print(f"Workers: {workers}")
+    
     uvicorn.run(
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
+        workers=workers,
+        # uvloop has no Windows build; fall back to the stdlib loop there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
         log_level=settings.LOG_LEVEL.lower(),
         access_log=True
     )
@@ -3,10 +3,15 @@ Terminal Chat Client for testing the Azure Foundry API
 """
 import asyncio
 import aiohttp
-import json
+import inspect
+import orjson
 import sys
-from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 # Constants
 API_BASE_URL = "http://localhost:8000"
@@ -18,6 +23,28 @@ MODELS_ENDPOINT = f"{API_BASE_URL}/api/v1/models"
 # Token for authentication (any string works for testing)
 AUTH_TOKEN = "test-token-12345"
 
+# Headers sent with every request (set once on the session)
+REQUEST_HEADERS = {
+    "Authorization": f"Bearer {AUTH_TOKEN}",
+    "Content-Type": "application/json"
+}
+
+# Maximum number of generate requests in flight during /batch
+BATCH_CONCURRENCY = 20
+
+# Approximate token budget for the history re-sent with each chat message
+MAX_HISTORY_TOKENS = 6000
+
+def _estimate_tokens(message: Dict[str, str]) -> int:
+    # About four characters per token for English text, plus per-message overhead
+    return len(message["content"]) // 4 + 4
+
+# Give up on a request after 2 minutes, or on the connection after 5 seconds
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=120, connect=5)
+# Streamed chat replies may run longer than any total limit; instead give up
+# when nothing arrives for 30 seconds (the server pings every 15 while idle)
+STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=5, sock_read=30)
+
 class Colors:
     """ANSI color codes for terminal output"""
     BLUE = '\033[94m'
@@ -27,14 +54,66 @@ class Colors:
     END = '\033[0m'
     BOLD = '\033[1m'
 
+def _colored_line(text: str, color: str) -> str:
+    return f"{color}{text}{Colors.END}"
+
+# Color for each role in /history; other roles fall back to blue
+ROLE_COLORS = {"user": Colors.GREEN, "assistant": Colors.BLUE}
+
+# Application header and command help, built once and written in a single call
+HEADER_TEXT = "\n".join([
+    _colored_line("=" * 60, Colors.BLUE),
+    _colored_line("🤖 Azure Foundry API Terminal Chat Client", Colors.BOLD),
+    _colored_line("=" * 60, Colors.BLUE),
+    _colored_line("Commands:", Colors.YELLOW),
+    _colored_line("  /help    - Show this help", Colors.GREEN),
+    _colored_line("  /health  - Check API health", Colors.GREEN),
+    _colored_line("  /models  - List available models", Colors.GREEN),
+    _colored_line("  /mode    - Switch between 'chat' and 'generate' modes", Colors.GREEN),
+    _colored_line("  /batch   - Generate several prompts concurrently", Colors.GREEN),
+    _colored_line("  /stats   - Show token usage for this session", Colors.GREEN),
+    _colored_line("  /history - Show chat history", Colors.GREEN),
+    _colored_line("  /clear   - Clear chat history", Colors.GREEN),
+    _colored_line("  /quit    - Exit the client", Colors.GREEN),
+    _colored_line("=" * 60, Colors.BLUE),
+    _colored_line("Current mode: {mode}", Colors.YELLOW),
+    "",
+    "",
+])
+
 class ChatClient:
     def __init__(self):
         self.session = None
         self.chat_history = []
         self.mode = "chat"  # or "generate"
+        self.running = True
+        # Running usage totals for /stats, updated as each response arrives
+        self.stats = {"requests": 0, "total_tokens": 0, "peak_tokens": 0}
+        # Slash-command dispatch table: command name -> handler
+        self._commands = {
+            "quit": self.quit,
+            "exit": self.quit,
+            "help": self.print_header,
+            "health": self.check_health,
+            "models": self.list_models,
+            "history": self.show_history,
+            "clear": self.clear_history,
+            "mode": self.switch_mode,
+            "batch": self.run_batch,
+            "stats": self.show_stats,
+        }
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        # Pooled keep-alive connections with cached DNS, reused for the whole run
+        connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60)
+        # Headers are set once on the session instead of per request
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=REQUEST_HEADERS,
+            timeout=REQUEST_TIMEOUT,
+            # orjson instead of the stdlib json module for request bodies
+            json_serialize=lambda obj: orjson.dumps(obj).decode()
+        )
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -43,31 +122,18 @@ class ChatClient:
     
     def print_colored(self, text: str, color: str = Colors.END):
         """Print colored text to terminal"""
-        print(f"{color}{text}{Colors.END}")
+        sys.stdout.write(_colored_line(text, color) + "\n")
     
     def print_header(self):
         """Print the application header"""
-        self.print_colored("=" * 60, Colors.BLUE)
-        self.print_colored("🤖 Azure Foundry API Terminal Chat Client", Colors.BOLD)
-        self.print_colored("=" * 60, Colors.BLUE)
-        self.print_colored("Commands:", Colors.YELLOW)
-        self.print_colored("  /help    - Show this help", Colors.GREEN)
-        self.print_colored("  /health  - Check API health", Colors.GREEN)
-        self.print_colored("  /models  - List available models", Colors.GREEN)
-        self.print_colored("  /mode    - Switch between 'chat' and 'generate' modes", Colors.GREEN)
-        self.print_colored("  /history - Show chat history", Colors.GREEN)
-        self.print_colored("  /clear   - Clear chat history", Colors.GREEN)
-        self.print_colored("  /quit    - Exit the client", Colors.GREEN)
-        self.print_colored("=" * 60, Colors.BLUE)
-        self.print_colored(f"Current mode: {self.mode}", Colors.YELLOW)
-        print()
+        sys.stdout.write(HEADER_TEXT.format(mode=self.mode))
     
     async def check_health(self):
         """Check API health"""
         try:
             async with self.session.get(HEALTH_ENDPOINT) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=orjson.loads)
                     self.print_colored("✅ API Health Check:", Colors.GREEN) 
                     self.print_colored(f"   Status: {data.get('status', 'unknown')}", Colors.GREEN)
                     self.print_colored(f"   Message: {data.get('message', 'N/A')}", Colors.GREEN)
@@ -81,10 +147,9 @@ class ChatClient:
     async def list_models(self):
         """List available models"""
         try:
-            headers = {"Authorization": f"Bearer {AUTH_TOKEN}"}
-            async with self.session.get(MODELS_ENDPOINT, headers=headers) as response:
+            async with self.session.get(MODELS_ENDPOINT) as response:
                 if response.status == 200:
-                    models = await response.json()
+                    models = await response.json(loads=orjson.loads)
                     self.print_colored("📋 Available Models:", Colors.GREEN)
                     for model in models:
                         self.print_colored(f"   • {model.get('id', 'unknown')} ({model.get('object', 'model')})", Colors.GREEN)
@@ -93,39 +158,72 @@ class ChatClient:
         except Exception as e:
             self.print_colored(f"❌ Error listing models: {str(e)}", Colors.RED)
     
+    def _trim_history(self):
+        """Drop the oldest turns until the history fits MAX_HISTORY_TOKENS"""
+        # A leading system message and the newest message are always kept
+        start = 1 if self.chat_history and self.chat_history[0]["role"] == "system" else 0
+        total = sum(_estimate_tokens(message) for message in self.chat_history)
+        while total > MAX_HISTORY_TOKENS and len(self.chat_history) > start + 1:
+            total -= _estimate_tokens(self.chat_history.pop(start))
+    
     async def send_chat_message(self, user_message: str) -> Dict[Any, Any]:
-        """Send a chat message to the API"""
+        """Send a chat message to the API, printing the reply as it streams in"""
         # Add user message to history
         self.chat_history.append({"role": "user", "content": user_message})
+        self._trim_history()
         
         # Prepare request payload
         payload = {
             "messages": self.chat_history,
             "max_tokens": 1000,
-            "temperature": 0.7
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {AUTH_TOKEN}",
-            "Content-Type": "application/json"
+            "temperature": 0.7,
+            "stream": True
         }
         
         try:
-            async with self.session.post(CHAT_ENDPOINT, json=payload, headers=headers) as response:
+            async with self.session.post(CHAT_ENDPOINT, json=payload, timeout=STREAM_TIMEOUT) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    parts = []
+                    model = "unknown"
+                    usage = {}
                     
-                    # Extract assistant response
-                    assistant_message = data['choices'][0]['message']['content']
+                    self.print_colored("🤖 Assistant:", Colors.BLUE)
+                    async for raw_line in response.content:
+                        line = raw_line.decode().strip()
+                        if not line.startswith("data: "):
+                            continue
+                        data = line[6:]
+                        if data == "[DONE]":
+                            break
+                        
+                        chunk = orjson.loads(data)
+                        if "error" in chunk:
+                            print()
+                            return {
+                                "success": False,
+                                "error": f"Stream failed: {chunk['error']}"
+                            }
+                        
+                        model = chunk.get('model') or model
+                        usage = chunk.get('usage') or usage
+                        for choice in chunk.get('choices') or []:
+                            delta = (choice.get('delta') or {}).get('content')
+                            if delta:
+                                parts.append(delta)
+                                sys.stdout.write(delta)
+                                sys.stdout.flush()
+                    print()
                     
                     # Add assistant response to history
+                    assistant_message = "".join(parts)
                     self.chat_history.append({"role": "assistant", "content": assistant_message})
+                    self.record_usage(usage.get('total_tokens'))
                     
                     return {
                         "success": True,
                         "message": assistant_message,
-                        "model": data.get('model', 'unknown'),
-                        "usage": data.get('usage', {})
+                        "model": model,
+                        "usage": usage
                     }
                 else:
                     error_text = await response.text()
@@ -147,15 +245,11 @@ class ChatClient:
             "temperature": 0.7
         }
         
-        headers = {
-            "Authorization": f"Bearer {AUTH_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
         try:
-            async with self.session.post(GENERATE_ENDPOINT, json=payload, headers=headers) as response:
+            async with self.session.post(GENERATE_ENDPOINT, json=payload) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=orjson.loads)
+                    self.record_usage(data.get('tokens_used'))
                     return {
                         "success": True,
                         "generated_text": data.get('generated_text', ''),
@@ -174,17 +268,73 @@ class ChatClient:
                 "error": f"Request failed: {str(e)}"
             }
     
+    async def send_generate_batch(self, prompts: List[str]) -> List[Dict[Any, Any]]:
+        """Send several text generation requests concurrently"""
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        
+        async def send_one(prompt: str) -> Dict[Any, Any]:
+            async with semaphore:
+                return await self.send_generate_request(prompt)
+        
+        return await asyncio.gather(*(send_one(prompt) for prompt in prompts))
+    
+    async def run_batch(self):
+        """Read prompts until a blank line, then generate them all concurrently"""
+        self.print_colored("📚 Enter one prompt per line, blank line to send:", Colors.YELLOW)
+        prompts = []
+        while True:
+            line = input("   > ").strip()
+            if not line:
+                break
+            prompts.append(line)
+        
+        if not prompts:
+            self.print_colored("📚 No prompts entered.", Colors.YELLOW)
+            return
+        
+        self.print_colored(f"🔄 Sending {len(prompts)} requests...", Colors.YELLOW)
+        results = await self.send_generate_batch(prompts)
+        
+        for i, (prompt, result) in enumerate(zip(prompts, results), 1):
+            self.print_colored(f"📝 [{i}] {prompt}", Colors.BLUE)
+            if result["success"]:
+                print(result["generated_text"])
+            else:
+                self.print_colored(f"❌ Error: {result['error']}", Colors.RED)
+        print()
+    
+    def record_usage(self, tokens: Optional[int]):
+        """Fold one response's token count into the running session totals"""
+        self.stats["requests"] += 1
+        if tokens:
+            self.stats["total_tokens"] += tokens
+            if tokens > self.stats["peak_tokens"]:
+                self.stats["peak_tokens"] = tokens
+    
+    def show_stats(self):
+        """Show token usage for this session"""
+        requests = self.stats["requests"]
+        average = self.stats["total_tokens"] / requests if requests else 0
+        self.print_colored("📊 Session Stats:", Colors.BLUE)
+        self.print_colored(f"   Requests: {requests}", Colors.GREEN)
+        self.print_colored(f"   Total tokens: {self.stats['total_tokens']}", Colors.GREEN)
+        self.print_colored(f"   Average tokens per response: {average:.1f}", Colors.GREEN)
+        self.print_colored(f"   Largest response: {self.stats['peak_tokens']} tokens", Colors.GREEN)
+    
     def show_history(self):
         """Show chat history"""
         if not self.chat_history:
             self.print_colored("📝 No chat history yet.", Colors.YELLOW)
             return
         
-        self.print_colored("📝 Chat History:", Colors.BLUE)
+        # Build the whole listing and write it in one call
+        lines = [_colored_line("📝 Chat History:", Colors.BLUE)]
         for i, message in enumerate(self.chat_history, 1):
-            role_color = Colors.GREEN if message['role'] == 'user' else Colors.BLUE
-            self.print_colored(f"{i}. [{message['role'].upper()}]: {message['content'][:100]}{'...' if len(message['content']) > 100 else ''}", role_color)
-        print()
+            role_color = ROLE_COLORS.get(message['role'], Colors.BLUE)
+            lines.append(_colored_line(f"{i}. [{message['role'].upper()}]: {message['content'][:100]}{'...' if len(message['content']) > 100 else ''}", role_color))
+        lines.extend(["", ""])
+        sys.stdout.write("\n".join(lines))
+        sys.stdout.flush()
     
     def clear_history(self):
         """Clear chat history"""
@@ -200,13 +350,18 @@ class ChatClient:
         else:
             self.print_colored("   Chat mode: Multi-turn conversation with history", Colors.YELLOW)
     
+    def quit(self):
+        """Stop the chat loop"""
+        self.print_colored("👋 Goodbye!", Colors.YELLOW)
+        self.running = False
+    
     async def run(self):
         """Main chat loop"""
         self.print_header()
         await self.check_health()
         print()
         
-        while True:
+        while self.running:
             try:
                 # Get user input
                 mode_indicator = "🤖" if self.mode == "chat" else "📝"
@@ -217,26 +372,16 @@ class ChatClient:
                     continue
                 
                 # Handle commands
-                if user_input.startswith('/'):
-                    command = user_input[1:].lower()
+                if user_input[0] == '/':
+                    command = user_input[1:].split(' ', 1)[0].lower()
+                    handler = self._commands.get(command)
                     
-                    if command == 'quit' or command == 'exit':
-                        self.print_colored("👋 Goodbye!", Colors.YELLOW)
-                        break
-                    elif command == 'help':
-                        self.print_header()
-                    elif command == 'health':
-                        await self.check_health()
-                    elif command == 'models':
-                        await self.list_models()
-                    elif command == 'history':
-                        self.show_history()
-                    elif command == 'clear':
-                        self.clear_history()
-                    elif command == 'mode':
-                        self.switch_mode()
-                    else:
+                    if handler is None:
                         self.print_colored(f"❌ Unknown command: {command}. Type /help for available commands.", Colors.RED)
+                    else:
+                        result = handler()
+                        if inspect.iscoroutine(result):
+                            await result
                     continue
                 
                 # Send request based on mode
@@ -246,9 +391,7 @@ class ChatClient:
                     result = await self.send_chat_message(user_input)
                     
                     if result["success"]:
-                        self.print_colored("🤖 Assistant:", Colors.BLUE)
-                        print(result["message"])
-                        
+                        # The reply has already been printed while streaming
                         # Show usage info
                         usage = result.get("usage", {})
                         if usage:
@@ -282,5 +425,8 @@ async def main():
         await client.run()
 
 if __name__ == "__main__":
+    # Use the faster uvloop event loop where it is installed
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     # Run the async main function
     asyncio.run(main())
@@ -1,23 +1,29 @@
 """
 Quick test of the restructured API
 """
-import requests
+import httpx
 import json
 
 def test_api():
     base_url = "http://localhost:8000"
     headers = {"Authorization": "Bearer test-token", "Content-Type": "application/json"}
     
+    # One pooled keep-alive connection serves every request below; the
+    # timeout leaves room for model latency (httpx defaults to 5s)
+    with httpx.Client(base_url=base_url, headers=headers, timeout=60) as client:
+        _run_tests(client)
+
+def _run_tests(client: httpx.Client):
     # Test health
     print("Testing health endpoint...")
-    response = requests.get(f"{base_url}/health")
+    response = client.get("/health")
     print(f"Health Status: {response.status_code}")
     print(f"Health Response: {response.json()}")
     print()
     
     # Test models
     print("Testing models endpoint...")
-    response = requests.get(f"{base_url}/api/v1/models", headers=headers)
+    response = client.get("/api/v1/models")
     print(f"Models Status: {response.status_code}")
     print(f"Models Response: {response.json()}")
     print()
@@ -30,7 +36,7 @@ def test_api():
         ],
         "max_tokens": 50
     }
-    response = requests.post(f"{base_url}/api/v1/chat/completions", headers=headers, json=chat_data)
+    response = client.post("/api/v1/chat/completions", json=chat_data)
     print(f"Chat Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -48,7 +54,7 @@ def test_api():
         "prompt": "Write a short greeting.",
         "max_tokens": 30
     }
-    response = requests.post(f"{base_url}/api/v1/generate", headers=headers, json=generate_data)
+    response = client.post("/api/v1/generate", json=generate_data)
     print(f"Generate Status: {response.status_code}")
     
     if response.status_code == 200:
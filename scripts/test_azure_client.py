@@ -1,19 +1,33 @@
 """
 Test client for Azure Foundry integration
 """
+import argparse
 import asyncio
+import contextlib
+import io
 import json
 import sys
 import os
+from typing import List, Optional
 
 # Add the parent directory to the path so we can import from app
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.config import get_settings
-from app.dependencies import get_azure_openai_client
+from app.dependencies import get_azure_openai_client, clear_azure_client_cache
 
-async def test_azure_client():
-    """Test the Azure OpenAI client connection"""
+DEFAULT_PROMPTS = ["Say hello and confirm you're working."]
+# Most probes in flight at once, to stay under the deployment's rate limits;
+# the SDK itself retries 429/503 responses with backoff
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "20"))
+SYSTEM_MESSAGE = {"role": "system", "content": "You are a helpful assistant."}
+
+async def test_azure_client(
+    prompts: Optional[List[str]] = None,
+    deployments: Optional[List[str]] = None
+):
+    """Test the async Azure OpenAI client connection"""
+    prompts = prompts or DEFAULT_PROMPTS
     print("Testing Azure Foundry client connection...")
     
     try:
@@ -22,33 +36,68 @@ async def test_azure_client():
         print(f"Endpoint: {settings.AZURE_FOUNDRY_ENDPOINT}")
         print(f"Model: {settings.AZURE_FOUNDRY_MODEL}")
         print(f"API Version: {settings.AZURE_FOUNDRY_API_VERSION}")
+        deployments = deployments or [settings.AZURE_FOUNDRY_MODEL]
         
         # Get client
         client = get_azure_openai_client()
         print("✅ Client created successfully")
         
-        # Test a simple completion
-        print("\nTesting chat completion...")
-        completion = client.chat.completions.create(
-            model=settings.AZURE_FOUNDRY_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": "Say hello and confirm you're working."}
-            ],
-            max_tokens=100
+        # Probe every deployment with every prompt at once; total time is the
+        # slowest round trip
+        probes = [(deployment, prompt) for deployment in deployments for prompt in prompts]
+        print(f"\nTesting chat completion with {len(prompts)} prompt(s) on {len(deployments)} deployment(s)...")
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        
+        async def probe(deployment: str, prompt: str):
+            async with semaphore:
+                return await client.chat.completions.create(
+                    model=deployment,
+                    messages=[SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+                    max_tokens=100
+                )
+        
+        # One failing deployment (e.g. a mistyped name) must not discard the
+        # other probes' results
+        completions = await asyncio.gather(
+            *(probe(d, p) for d, p in probes), return_exceptions=True
         )
         
-        response = completion.choices[0].message.content
-        print(f"✅ Response: {response}")
-        print(f"✅ Model: {completion.model}")
-        print(f"✅ Tokens used: {completion.usage.total_tokens if completion.usage else 'unknown'}")
+        failed = 0
+        for (deployment, prompt), completion in zip(probes, completions):
+            print(f"\n[{deployment}] Prompt: {prompt}")
+            if isinstance(completion, BaseException):
+                failed += 1
+                print(f"❌ Error: {str(completion)}")
+                continue
+            response = completion.choices[0].message.content
+            print(f"✅ Response: {response}")
+            print(f"✅ Model: {completion.model}")
+            print(f"✅ Tokens used: {completion.usage.total_tokens if completion.usage else 'unknown'}")
+        
+        print(f"\nSummary: {len(probes) - failed}/{len(probes)} probes passed")
         
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         return False
+    finally:
+        await clear_azure_client_cache()
     
-    return True
+    return failed == 0
 
 if __name__ == "__main__":
-    result = asyncio.run(test_azure_client())
+    parser = argparse.ArgumentParser(description="Test the Azure Foundry client connection")
+    parser.add_argument("prompts", nargs="*", help="Prompts to send concurrently (default: a single hello)")
+    parser.add_argument(
+        "--deployment", action="append", dest="deployments",
+        help="Deployment to probe; repeat to probe several in parallel (default: AZURE_FOUNDRY_MODEL)"
+    )
+    args = parser.parse_args()
+    
+    # Collect the report and write it in one call instead of one per line
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            result = asyncio.run(test_azure_client(args.prompts, args.deployments))
+    finally:
+        sys.stdout.write(buffer.getvalue())
     sys.exit(0 if result else 1)